@@ -1,73 +1,642 @@
-from prometheus_client import start_http_server, Counter, Gauge, Histogram, Summary
+import ctypes
+import os
+import socket
+import sys
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from socketserver import ThreadingMixIn
+from threading import get_ident
+from wsgiref.simple_server import make_server, WSGIRequestHandler, WSGIServer
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, Summary, multiprocess
+from prometheus_client.core import CounterMetricFamily
+from prometheus_client.exposition import CONTENT_TYPE_LATEST
+from prometheus_client.openmetrics import exposition as openmetrics
+from prometheus_client.utils import floatToGoString
 from typing import Optional, Union, Dict
 
 
+# Interned metric-kind keys: dict probes on these short-circuit on identity
+# instead of hashing and comparing the string, and literal "counter" etc. at
+# call sites are interned by the compiler and hit the same fast path.
+_COUNTER = sys.intern('counter')
+_GAUGE = sys.intern('gauge')
+_HISTOGRAM = sys.intern('histogram')
+_SUMMARY = sys.intern('summary')
+
+# Placeholder inserted by the define_* methods while a metric is being
+# constructed, so registration needs one dict probe instead of a
+# membership check followed by a store.
+_UNREGISTERED = object()
+
+
+class _ThreadedMetricsServer(ThreadingMixIn, WSGIServer):
+    """
+    Multithreaded WSGI server for the exposition endpoint, so concurrent
+    scrapers are served in parallel instead of queueing behind one request.
+    The socket is tuned for Prometheus's persistent scrape connections.
+    """
+    daemon_threads = True
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().server_bind()
+
+
+class _SilentRequestHandler(WSGIRequestHandler):
+    """Request handler that does not log each scrape to stderr."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ThreadCounter:
+    """Per-thread increment accumulator used by _BufferedCounter."""
+    __slots__ = ('total', 'flushed', 'owner')
+
+    def __init__(self):
+        self.total = 0.0
+        self.flushed = 0.0
+        self.owner = weakref.ref(threading.current_thread())
+
+
+class _BufferedCounter:
+    """
+    Opt-in wrapper around a Counter that buffers increments per thread.
+    inc() only touches a thread-local accumulator, so hot threads never
+    contend on prometheus_client's family lock. A daemon timer flushes each
+    thread's outstanding delta into the real counter every FLUSH_INTERVAL
+    seconds, so scraped values lag live increments by at most one interval.
+    """
+
+    FLUSH_INTERVAL = 0.1
+
+    def __init__(self, counter: Counter):
+        self._counter = counter
+        self._tls = threading.local()
+        self._accumulators = set()
+        self._lock = threading.Lock()
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        timer = threading.Timer(self.FLUSH_INTERVAL, self._flush_loop)
+        timer.daemon = True
+        timer.start()
+        self._timer = timer
+
+    def _flush_loop(self) -> None:
+        self.flush()
+        self._schedule_flush()
+
+    def flush(self) -> None:
+        """
+        Push every thread's outstanding delta into the real counter.
+        Each accumulator's total is only written by its owning thread and
+        flushed only under self._lock, so no increment is lost or doubled.
+        Accumulators whose thread has exited are dropped once fully flushed.
+        """
+        with self._lock:
+            for acc in list(self._accumulators):
+                total = acc.total
+                delta = total - acc.flushed
+                if delta:
+                    self._counter.inc(delta)
+                    acc.flushed = total
+                owner = acc.owner()
+                if owner is None or not owner.is_alive():
+                    self._accumulators.discard(acc)
+
+    def inc(self, amount: Union[int, float] = 1) -> None:
+        try:
+            acc = self._tls.acc
+        except AttributeError:
+            acc = self._tls.acc = _ThreadCounter()
+            with self._lock:
+                self._accumulators.add(acc)
+        acc.total += amount
+
+    def labels(self, *labelvalues, **labelkwargs):
+        """Pass through to the real counter; labeled children are unbuffered."""
+        return self._counter.labels(*labelvalues, **labelkwargs)
+
+    @property
+    def _metrics(self):
+        """Children map of the real counter, so series budgets see it."""
+        return self._counter._metrics
+
+
+class _FastCounter:
+    """
+    Minimal unlabeled integer counter registered as a custom collector.
+    inc() is a bare lock-plus-integer-add with none of prometheus_client's
+    per-call checks or value-object indirection, and the running total is
+    only materialized as a metric family when scraped. The lock is
+    uncontended in the common case, making this the pure-Python stand-in
+    for an atomic fetch-add.
+    """
+    __slots__ = ('_name', '_documentation', '_value', '_lock')
+
+    def __init__(self, name: str, documentation: str, registry=REGISTRY):
+        self._name = name
+        self._documentation = documentation
+        self._value = 0
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, amount: Union[int, float] = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def collect(self):
+        family = CounterMetricFamily(self._name, self._documentation)
+        family.add_metric((), self._value)
+        return [family]
+
+
+class _Int64Counter:
+    """
+    Unlabeled counter whose total lives in a ctypes.c_int64.
+    Increments add onto the fixed-width integer in place, so no Python
+    float is boxed per call; the total is converted to float only when the
+    sample is built at scrape time. Intended for integer-only workloads
+    such as request or byte counts.
+    """
+    __slots__ = ('_name', '_documentation', '_value', '_lock')
+
+    def __init__(self, name: str, documentation: str, registry=REGISTRY):
+        self._name = name
+        self._documentation = documentation
+        self._value = ctypes.c_int64(0)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value.value += amount
+
+    def collect(self):
+        family = CounterMetricFamily(self._name, self._documentation)
+        family.add_metric((), float(self._value.value))
+        return [family]
+
+
+class _CounterShard:
+    """One independently locked slice of a _ShardedCounter."""
+    __slots__ = ('value', 'lock')
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+
+class _ShardedCounter:
+    """
+    Unlabeled counter striped across several independently locked shards.
+    Each thread picks a shard from its thread id, so concurrent writers
+    almost always take different locks instead of serializing on a single
+    one; the scrape path sums the shards. The shard count is rounded up to
+    a power of two so the index is a mask rather than a modulo.
+    """
+    __slots__ = ('_name', '_documentation', '_shards', '_mask')
+
+    def __init__(self, name: str, documentation: str, shards: int = 16, registry=REGISTRY):
+        if shards < 1:
+            raise ValueError("Shard count must be a positive integer.")
+        n = 1
+        while n < shards:
+            n <<= 1
+        self._name = name
+        self._documentation = documentation
+        self._shards = [_CounterShard() for _ in range(n)]
+        self._mask = n - 1
+        registry.register(self)
+
+    def inc(self, amount: Union[int, float] = 1) -> None:
+        shard = self._shards[get_ident() & self._mask]
+        with shard.lock:
+            shard.value += amount
+
+    def collect(self):
+        family = CounterMetricFamily(self._name, self._documentation)
+        family.add_metric((), sum(shard.value for shard in self._shards))
+        return [family]
+
+
+class MetricHandle:
+    """
+    Lightweight handle onto a single metric family.
+    Holds the family and its pre-bound update methods in __slots__, so a
+    caller can fetch one handle (typically into a module-level constant)
+    and invoke handle.inc(...) / handle.observe(...) with no per-call name
+    lookup at all.
+    """
+    __slots__ = ('family', 'inc', 'dec', 'observe', 'labels')
+
+    def __init__(self, family):
+        self.family = family
+        self.inc = getattr(family, 'inc', None)
+        self.dec = getattr(family, 'dec', None)
+        self.observe = getattr(family, 'observe', None)
+        self.labels = getattr(family, 'labels', None)
+
+
 class Metrics:
     """
     Abstraction class for managing Prometheus metrics.
     Provides methods to define and manipulate Prometheus metrics such as counters, gauges, histograms, and summaries.
     """
 
+    __slots__ = ('port', '_counters', '_gauges', '_histograms', '_summaries',
+                 '_child_cache', '_label_tuple_intern', '_counter_inc',
+                 '_gauge_inc', '_gauge_dec', '_hist_observe', '_summary_observe',
+                 '_buckets', '_hist_upper', '_handles', '_labelnames',
+                 '_families', '_last_bucket_reset', '_max_series',
+                 '_normalize_labels', '_http_server', '_registry',
+                 '_exposition_prefix')
+
+    # Minimum seconds between bucket resets of the same histogram.
+    RESET_MIN_INTERVAL = 60.0
+
+    # Label values of the sentinel child that absorbs observations once a
+    # metric's series budget is exhausted.
+    OVERFLOW_LABEL = "__overflow__"
+
     def __init__(self, port: int):
         """
         Initialize the Metrics class with the HTTP server port.
         Args:
             port (int): Port to start the Prometheus HTTP server.
         """
-        if not isinstance(port, int) or port <= 0:
-            raise ValueError("Port must be a positive integer.")
+        self._validate_port(port)
 
         self.port = port
-        self.metrics = {
-            "counter": {},
-            "gauge": {},
-            "histogram": {},
-            "summary": {}
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._summaries = {}
+        self._child_cache = {}
+        # Canonical instances of previously seen label-value tuples, so the
+        # child-cache key compares by identity on the steady-state path.
+        self._label_tuple_intern = {}
+        # Unlabeled bound methods captured at define time so the common
+        # unlabeled update is a single dict lookup plus one call.
+        self._counter_inc = {}
+        self._gauge_inc = {}
+        self._gauge_dec = {}
+        self._hist_observe = {}
+        self._summary_observe = {}
+        # Canonicalized bucket boundaries per histogram, kept for later
+        # inspection and dynamic bucket adjustment.
+        self._buckets = {}
+        # Upper bounds (including +Inf) per histogram, used for bisection.
+        self._hist_upper = {}
+        self._handles = {}
+        # Declared label names per metric, for sanity checks without
+        # re-deriving them from a dict.
+        self._labelnames = {}
+        self._families = {
+            _COUNTER: self._counters,
+            _GAUGE: self._gauges,
+            _HISTOGRAM: self._histograms,
+            _SUMMARY: self._summaries
         }
+        self._last_bucket_reset = {}
+        # Per-metric series budgets and label-value normalizers, enforced
+        # centrally in _child so unbounded label values cannot blow up
+        # series cardinality.
+        self._max_series = {}
+        self._normalize_labels = {}
+        # In multi-worker deployments (gunicorn, uvicorn) each worker writes
+        # its values to mmap files under PROMETHEUS_MULTIPROC_DIR; scrapes
+        # then aggregate across workers through a MultiProcessCollector.
+        # Static pieces of the text exposition (HELP/TYPE headers and
+        # escaped sample-name-plus-labels prefixes), built on first scrape.
+        self._exposition_prefix = {}
+        self._registry = None
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.environ.get('prometheus_multiproc_dir'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            self._registry = registry
+
+    @staticmethod
+    def _validate_port(port) -> None:
+        """Validate the HTTP server port; non-numbers fail on the comparison."""
+        if port <= 0:
+            raise ValueError("Port must be a positive integer.")
+
+    @staticmethod
+    def _validate_buckets(buckets) -> tuple:
+        """
+        Validate histogram bucket boundaries and return them as a sorted
+        tuple so prometheus_client does not re-sort or copy the list.
+        """
+        if not buckets or not all(isinstance(b, (int, float)) for b in buckets):
+            raise ValueError("Buckets must be a non-empty list of numbers.")
+        return tuple(sorted(buckets))
+
+    @staticmethod
+    def _bisect_observe(child):
+        """
+        Return an observe() equivalent for the given histogram (family or
+        child) that picks the target bucket with bisect_left instead of
+        prometheus_client's linear scan over the upper bounds, with the
+        bucket values and sum bound as closure locals.
+        """
+        upper_bounds = child._upper_bounds
+        buckets = child._buckets
+        sum_value = child._sum
+
+        def observe(value):
+            buckets[bisect_left(upper_bounds, value)].inc(1)
+            sum_value.inc(value)
+
+        return observe
+
+    @staticmethod
+    def _validate_objectives(objectives) -> None:
+        """Validate summary quantile objectives."""
+        if not all(isinstance(k, (int, float)) and isinstance(v, (int, float)) for k, v in objectives.items()):
+            raise ValueError("Objectives must be a dictionary of numbers.")
+
+    def _specialize_labeled_inc(self, name: str, counter):
+        """
+        Generate a per-counter increment function for a labeled counter.
+        The emitted bytecode binds the child resolver, family, and name as
+        argument defaults, so a call is inc(amount, *label_values) with no
+        attribute loads on self at all: one child-cache probe plus the
+        child's bound inc.
+        """
+        namespace = {'_child': self._child, '_family': counter, '_name': name}
+        source = ("def inc(amount=1, *vals, _child=_child, _family=_family, _name=_name):\n"
+                  "    _child(_family, _name, vals).inc(amount)\n")
+        exec(compile(source, f"<metrics specialization of '{name}'>", "exec"), namespace)
+        return namespace['inc']
+
+    def _prewarm_children(self, name: str, metric, prewarm) -> None:
+        """
+        Mint and cache the children for known label combinations, so the
+        first real observation of each is a pure cache hit with no
+        allocation.
+        """
+        for combo in prewarm:
+            self._child(metric, name, tuple(combo))
+
+    def _set_label_budget(self, name: str, max_series, normalize_labels) -> None:
+        """Record a metric's series budget and label-value normalizer."""
+        if max_series is not None:
+            if max_series < 1:
+                raise ValueError("max_series must be a positive integer.")
+            self._max_series[name] = max_series
+        if normalize_labels is not None:
+            self._normalize_labels[name] = normalize_labels
+
+    @property
+    def metrics(self) -> Dict[str, dict]:
+        """
+        View of all defined metrics grouped by kind, for backward compatibility.
+        Hot-path methods use the flat per-kind dicts directly to avoid the
+        extra lookup.
+        """
+        return dict(self._families)
 
     def initiate_http_server(self) -> None:
         """
         Start the Prometheus HTTP server on the specified port.
+        The server is multithreaded with keepalive enabled, so concurrent
+        scrapes are handled in parallel over reused connections. When
+        PROMETHEUS_MULTIPROC_DIR is set, scrapes aggregate values across
+        all worker processes instead of exposing this process's registry.
         Raises:
             RuntimeError: If the server fails to start.
         """
+        def app(environ, start_response):
+            data = self.generate_exposition()
+            start_response('200 OK', [('Content-Type', CONTENT_TYPE_LATEST),
+                                      ('Content-Length', str(len(data)))])
+            return [data]
+
         try:
-            start_http_server(port=self.port)
+            server = make_server('', self.port, app,
+                                 server_class=_ThreadedMetricsServer,
+                                 handler_class=_SilentRequestHandler)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._http_server = server
         except Exception as e:
             raise RuntimeError(f"Failed to start HTTP server on port {self.port}: {e}")
 
-    def define_counter(self, name: str, description: str, labels: Optional[Dict[str, str]] = None) -> None:
+    def generate_exposition(self) -> bytes:
+        """
+        Render the registry in the Prometheus text format, matching
+        prometheus_client.generate_latest byte for byte, but with every
+        static piece of a line (escaped names, formatted label pairs,
+        HELP/TYPE headers) cached after the first scrape so steady-state
+        scrapes only format the numeric values.
+        """
+        registry = self._registry if self._registry is not None else REGISTRY
+        prefix_cache = self._exposition_prefix
+        output = []
+        for metric in registry.collect():
+            name = metric.name
+            header = prefix_cache.get(name)
+            if header is None:
+                mname = name
+                mtype = metric.type
+                if mtype == 'counter':
+                    mname = mname + '_total'
+                elif mtype == 'info':
+                    mname = mname + '_info'
+                    mtype = 'gauge'
+                elif mtype == 'stateset':
+                    mtype = 'gauge'
+                elif mtype == 'gaugehistogram':
+                    mtype = 'histogram'
+                elif mtype == 'unknown':
+                    mtype = 'untyped'
+                escaped = openmetrics.escape_metric_name(mname, openmetrics.UNDERSCORES)
+                documentation = metric.documentation.replace('\\', r'\\').replace('\n', r'\n')
+                header = f'# HELP {escaped} {documentation}\n# TYPE {escaped} {mtype}\n'
+                prefix_cache[name] = header
+            output.append(header)
+
+            om_samples = {}
+            for sample in metric.samples:
+                for suffix in ('_created', '_gsum', '_gcount'):
+                    if sample.name == name + suffix:
+                        # OpenMetrics-specific sample, exposed as a gauge at the end.
+                        om_samples.setdefault(suffix, []).append(self._sample_line(sample))
+                        break
+                else:
+                    output.append(self._sample_line(sample))
+
+            for suffix, lines in sorted(om_samples.items()):
+                gauge_name = name + suffix
+                gauge_header = prefix_cache.get(gauge_name)
+                if gauge_header is None:
+                    escaped = openmetrics.escape_metric_name(gauge_name, openmetrics.UNDERSCORES)
+                    documentation = metric.documentation.replace('\\', r'\\').replace('\n', r'\n')
+                    gauge_header = f'# HELP {escaped} {documentation}\n# TYPE {escaped} gauge\n'
+                    prefix_cache[gauge_name] = gauge_header
+                output.append(gauge_header)
+                output.extend(lines)
+        return ''.join(output).encode('utf-8')
+
+    def _sample_line(self, sample) -> str:
+        """
+        Format one exposition sample, reusing the cached escaped-name and
+        label-string prefix so only the value (and rare timestamp) is
+        formatted per scrape.
+        """
+        if sample.labels:
+            label_items = tuple(sorted(sample.labels.items()))
+            key = (sample.name, label_items)
+        else:
+            label_items = ()
+            key = (sample.name,)
+        prefix = self._exposition_prefix.get(key)
+        if prefix is None:
+            labelstr = ','.join(
+                '{}="{}"'.format(openmetrics.escape_label_name(k, openmetrics.UNDERSCORES),
+                                 openmetrics._escape(v, openmetrics.ALLOWUTF8, False))
+                for k, v in label_items)
+            if labelstr:
+                labelstr = '{' + labelstr + '}'
+            prefix = f'{openmetrics.escape_metric_name(sample.name, openmetrics.UNDERSCORES)}{labelstr} '
+            self._exposition_prefix[key] = prefix
+        if sample.timestamp is not None:
+            return f'{prefix}{floatToGoString(sample.value)} {int(float(sample.timestamp) * 1000):d}\n'
+        return f'{prefix}{floatToGoString(sample.value)}\n'
+
+    def define_counter(self, name: str, description: str, labels: Optional[Dict[str, str]] = None,
+                       buffered: bool = False, labelnames: Optional[tuple] = None,
+                       fast: bool = False, shards: Optional[int] = None,
+                       integer: bool = False,
+                       max_series: Optional[int] = None, normalize_labels=None,
+                       prewarm=None) -> None:
         """
         Define a Prometheus counter metric.
         Args:
             name (str): Name of the counter.
             description (str): Description of the counter.
             labels (Optional[Dict[str, str]]): Dictionary of label names and default values.
+                Deprecated for definition; prefer labelnames.
+            buffered (bool): If True, buffer unlabeled increments per thread and
+                flush to the real counter periodically (avoids lock contention).
+            labelnames (Optional[tuple]): Label names as a tuple; only names matter
+                at declaration, so this avoids building a throwaway dict.
+            fast (bool): If True, use a minimal integer counter that skips
+                prometheus_client's per-increment machinery; unlabeled only.
+            shards (Optional[int]): If set, stripe the counter across this many
+                independently locked shards summed at scrape time; unlabeled only.
+            integer (bool): If True, store the total in a fixed-width int64 and
+                convert to float only at scrape time; unlabeled only.
+            max_series (Optional[int]): Budget of label sets; once exhausted, new
+                label sets are coalesced into one overflow child.
+            normalize_labels (Optional[Callable]): Maps a label-value tuple to a
+                normalized tuple before child lookup (e.g., collapse IDs).
+            prewarm (Optional[Iterable[tuple]]): Label-value tuples whose children
+                are created and cached now rather than on first observation.
         Raises:
-            ValueError: If the name already exists.
+            ValueError: If the name already exists or the options conflict.
         """
-        if name in self.metrics["counter"]:
+        if self._counters.setdefault(name, _UNREGISTERED) is not _UNREGISTERED:
             raise ValueError(f"Counter with name '{name}' already exists.")
 
-        self.metrics["counter"][name] = Counter(name, description, labelnames=labels.keys() if labels else None)
+        try:
+            if labelnames is None:
+                labelnames = tuple(labels.keys()) if labels else ()
+            # Validate the budget options before the metric is constructed,
+            # since construction registers it with the global registry.
+            self._set_label_budget(name, max_series, normalize_labels)
+            if fast or integer or shards is not None:
+                if labelnames or buffered or (fast + integer + (shards is not None)) > 1:
+                    raise ValueError("Fast, integer, and sharded counters are unlabeled, "
+                                     "unbuffered, and mutually exclusive.")
+                if self._registry is not None:
+                    # These register plain custom collectors with the global
+                    # registry, which the multiprocess scrape never reads, so
+                    # their values would be silently lost.
+                    raise ValueError("Fast, integer, and sharded counters are not "
+                                     "supported with PROMETHEUS_MULTIPROC_DIR.")
+                if shards is not None:
+                    counter = _ShardedCounter(name, description, shards)
+                elif integer:
+                    counter = _Int64Counter(name, description)
+                else:
+                    counter = _FastCounter(name, description)
+            else:
+                counter = Counter(name, description, labelnames=labelnames)
+                if buffered:
+                    counter = _BufferedCounter(counter)
+            self._counters[name] = counter
+            self._counter_inc[name] = counter.inc
+            self._labelnames[name] = labelnames
+        except BaseException:
+            del self._counters[name]
+            self._max_series.pop(name, None)
+            self._normalize_labels.pop(name, None)
+            raise
+        if prewarm:
+            self._prewarm_children(name, counter, prewarm)
+
+        # Pre-build the handle with a specialized inc: unlabeled counters get
+        # the bound method itself, labeled ones a generated function whose
+        # dependencies are baked in as argument defaults.
+        handle = MetricHandle(counter)
+        if labelnames:
+            handle.inc = self._specialize_labeled_inc(name, counter)
+        self._handles[(_COUNTER, name)] = handle
 
-    def define_gauge(self, name: str, description: str, labels: Optional[Dict[str, str]] = None) -> None:
+    def define_gauge(self, name: str, description: str, labels: Optional[Dict[str, str]] = None,
+                     labelnames: Optional[tuple] = None,
+                     max_series: Optional[int] = None, normalize_labels=None,
+                     prewarm=None) -> None:
         """
         Define a Prometheus gauge metric.
         Args:
             name (str): Name of the gauge.
             description (str): Description of the gauge.
             labels (Optional[Dict[str, str]]): Dictionary of label names and default values.
+                Deprecated for definition; prefer labelnames.
+            labelnames (Optional[tuple]): Label names as a tuple.
+            max_series (Optional[int]): Budget of label sets; once exhausted, new
+                label sets are coalesced into one overflow child.
+            normalize_labels (Optional[Callable]): Maps a label-value tuple to a
+                normalized tuple before child lookup.
+            prewarm (Optional[Iterable[tuple]]): Label-value tuples whose children
+                are created and cached now rather than on first observation.
         Raises:
             ValueError: If the name already exists.
         """
-        if name in self.metrics["gauge"]:
+        if self._gauges.setdefault(name, _UNREGISTERED) is not _UNREGISTERED:
             raise ValueError(f"Gauge with name '{name}' already exists.")
 
-        self.metrics["gauge"][name] = Gauge(name, description, labelnames=labels.keys() if labels else None)
+        try:
+            if labelnames is None:
+                labelnames = tuple(labels.keys()) if labels else ()
+            self._set_label_budget(name, max_series, normalize_labels)
+            gauge = Gauge(name, description, labelnames=labelnames)
+            self._gauges[name] = gauge
+            self._gauge_inc[name] = gauge.inc
+            self._gauge_dec[name] = gauge.dec
+            self._labelnames[name] = labelnames
+        except BaseException:
+            del self._gauges[name]
+            self._max_series.pop(name, None)
+            self._normalize_labels.pop(name, None)
+            raise
+        if prewarm:
+            self._prewarm_children(name, gauge, prewarm)
 
     def define_histogram(self, name: str, description: str, buckets: Optional[list] = None,
-                         labels: Optional[Dict[str, str]] = None) -> None:
+                         labels: Optional[Dict[str, str]] = None,
+                         labelnames: Optional[tuple] = None,
+                         max_series: Optional[int] = None, normalize_labels=None,
+                         prewarm=None) -> None:
         """
         Define a Prometheus histogram metric.
         Args:
@@ -75,20 +644,48 @@ class Metrics:
             description (str): Description of the histogram.
             buckets (Optional[list]): List of bucket boundaries for the histogram.
             labels (Optional[Dict[str, str]]): Dictionary of label names and default values.
+                Deprecated for definition; prefer labelnames.
+            labelnames (Optional[tuple]): Label names as a tuple.
+            max_series (Optional[int]): Budget of label sets; once exhausted, new
+                label sets are coalesced into one overflow child.
+            normalize_labels (Optional[Callable]): Maps a label-value tuple to a
+                normalized tuple before child lookup.
+            prewarm (Optional[Iterable[tuple]]): Label-value tuples whose children
+                are created and cached now rather than on first observation.
         Raises:
             ValueError: If the name already exists or buckets are invalid.
         """
-        if name in self.metrics["histogram"]:
+        if self._histograms.setdefault(name, _UNREGISTERED) is not _UNREGISTERED:
             raise ValueError(f"Histogram with name '{name}' already exists.")
 
-        if buckets and not all(isinstance(b, (int, float)) for b in buckets):
-            raise ValueError("Buckets must be a list of numbers.")
-
-        self.metrics["histogram"][name] = Histogram(name, description, buckets=buckets,
-                                                    labelnames=labels.keys() if labels else None)
+        try:
+            if labelnames is None:
+                labelnames = tuple(labels.keys()) if labels else ()
+            self._set_label_budget(name, max_series, normalize_labels)
+            if buckets is not None:
+                buckets = self._validate_buckets(buckets)
+                histogram = Histogram(name, description, buckets=buckets, labelnames=labelnames)
+            else:
+                histogram = Histogram(name, description, labelnames=labelnames)
+                buckets = tuple(Histogram.DEFAULT_BUCKETS)
+            self._histograms[name] = histogram
+            self._hist_observe[name] = self._bisect_observe(histogram) if not labelnames else histogram.observe
+            self._buckets[name] = buckets
+            self._hist_upper[name] = tuple(histogram._upper_bounds)
+            self._labelnames[name] = labelnames
+        except BaseException:
+            del self._histograms[name]
+            self._max_series.pop(name, None)
+            self._normalize_labels.pop(name, None)
+            raise
+        if prewarm:
+            self._prewarm_children(name, histogram, prewarm)
 
     def define_summary(self, name: str, description: str, objectives: Optional[dict] = None,
-                       labels: Optional[Dict[str, str]] = None) -> None:
+                       labels: Optional[Dict[str, str]] = None,
+                       labelnames: Optional[tuple] = None,
+                       max_series: Optional[int] = None, normalize_labels=None,
+                       prewarm=None) -> None:
         """
         Define a Prometheus summary metric.
         Args:
@@ -96,112 +693,341 @@ class Metrics:
             description (str): Description of the summary.
             objectives (Optional[dict]): Map of quantile to error.
             labels (Optional[Dict[str, str]]): Dictionary of label names and default values.
+                Deprecated for definition; prefer labelnames.
+            labelnames (Optional[tuple]): Label names as a tuple.
+            max_series (Optional[int]): Budget of label sets; once exhausted, new
+                label sets are coalesced into one overflow child.
+            normalize_labels (Optional[Callable]): Maps a label-value tuple to a
+                normalized tuple before child lookup.
+            prewarm (Optional[Iterable[tuple]]): Label-value tuples whose children
+                are created and cached now rather than on first observation.
         Raises:
             ValueError: If the name already exists or objectives are invalid.
         """
-        if name in self.metrics["summary"]:
+        if self._summaries.setdefault(name, _UNREGISTERED) is not _UNREGISTERED:
             raise ValueError(f"Summary with name '{name}' already exists.")
 
-        if objectives and not all(
-                isinstance(k, (int, float)) and isinstance(v, (int, float)) for k, v in objectives.items()):
-            raise ValueError("Objectives must be a dictionary of numbers.")
+        try:
+            if labelnames is None:
+                labelnames = tuple(labels.keys()) if labels else ()
+            self._set_label_budget(name, max_series, normalize_labels)
+            if objectives:
+                self._validate_objectives(objectives)
+                summary = Summary(name, description, objectives=objectives, labelnames=labelnames)
+            else:
+                summary = Summary(name, description, labelnames=labelnames)
+            self._summaries[name] = summary
+            self._summary_observe[name] = summary.observe
+            self._labelnames[name] = labelnames
+        except BaseException:
+            del self._summaries[name]
+            self._max_series.pop(name, None)
+            self._normalize_labels.pop(name, None)
+            raise
+        if prewarm:
+            self._prewarm_children(name, summary, prewarm)
 
-        self.metrics["summary"][name] = Summary(name, description, objectives=objectives,
-                                                labelnames=labels.keys() if labels else None)
+    def get(self, name: str, kind: str) -> MetricHandle:
+        """
+        Return a cached MetricHandle for the named metric.
+        Args:
+            name (str): Name of the metric.
+            kind (str): One of "counter", "gauge", "histogram", "summary".
+        Raises:
+            KeyError: If the metric does not exist.
+        """
+        try:
+            return self._handles[(kind, name)]
+        except KeyError:
+            pass
+
+        try:
+            family = self._families[kind][name]
+        except KeyError:
+            raise KeyError(f"{kind.capitalize()} with name '{name}' does not exist.")
+        handle = MetricHandle(family)
+        self._handles[(kind, name)] = handle
+        return handle
 
-    def increment_counter(self, name: str, amount: int = 1, labels: Optional[Dict[str, str]] = None) -> None:
+    def _child(self, metric, name: str, label_values: tuple):
+        """
+        Return the child metric for the given label values, caching it keyed
+        by (name, label_values) so repeated observations with the same labels
+        skip prometheus_client's per-call child lookup. Label tuples are
+        interned so equal tuples from different call sites share one object
+        and the cache probe short-circuits on identity. Metrics defined with
+        a normalizer or series budget have both applied here: values are
+        normalized before the lookup, and once the budget is exhausted new
+        label sets are coalesced into a single overflow child rather than
+        minting fresh series.
+        """
+        normalize = self._normalize_labels.get(name)
+        if normalize is not None:
+            label_values = tuple(normalize(label_values))
+        key = (name, label_values)
+        child = self._child_cache.get(key)
+        if child is not None:
+            return child
+
+        limit = self._max_series.get(name)
+        if limit is not None and len(metric._metrics) >= limit:
+            label_values = (self.OVERFLOW_LABEL,) * len(label_values)
+            key = (name, label_values)
+            child = self._child_cache.get(key)
+            if child is not None:
+                return child
+        label_values = self._label_tuple_intern.setdefault(label_values, label_values)
+        child = metric.labels(*label_values)
+        self._child_cache[(name, label_values)] = child
+        return child
+
+    def _ordered_label_values(self, name: str, labels: Dict[str, str], kind: str) -> tuple:
+        """
+        Convert the legacy labels dict to a value tuple in declaration
+        order, so the dict form matches labels by name the way
+        labels(**labels) did, regardless of the caller's insertion order.
+        """
+        try:
+            labelnames = self._labelnames[name]
+        except KeyError:
+            raise KeyError(f"{kind} with name '{name}' does not exist.")
+        extra = set(labels).difference(labelnames)
+        if extra:
+            raise ValueError(f"Incorrect label names for '{name}': "
+                             f"unexpected {sorted(extra)}.")
+        try:
+            return tuple(labels[label] for label in labelnames)
+        except KeyError as e:
+            raise ValueError(f"Incorrect label names for '{name}': missing {e}.")
+
+    def increment_counter(self, name: str, amount: int = 1, labels: Optional[Dict[str, str]] = None,
+                          label_values: Optional[tuple] = None) -> None:
         """
         Increment a counter metric.
         Args:
             name (str): Name of the counter.
             amount (int): Amount to increment (default is 1).
             labels (Optional[Dict[str, str]]): Dictionary of label values to associate with this increment.
+            label_values (Optional[tuple]): Label values in declaration order; faster than the dict form.
         Raises:
             KeyError: If the counter does not exist.
         """
-        if name not in self.metrics["counter"]:
-            raise KeyError(f"Counter with name '{name}' does not exist.")
-
-        metric = self.metrics["counter"][name]
-        if labels:
-            metric.labels(**labels).inc(amount)
+        if label_values is None and labels:
+            label_values = self._ordered_label_values(name, labels, "Counter")
+        if label_values is not None:
+            try:
+                metric = self._counters[name]
+            except KeyError:
+                raise KeyError(f"Counter with name '{name}' does not exist.")
+            self._child(metric, name, label_values).inc(amount)
         else:
-            metric.inc(amount)
+            try:
+                inc = self._counter_inc[name]
+            except KeyError:
+                raise KeyError(f"Counter with name '{name}' does not exist.")
+            inc(amount)
 
     def increment_gauge(self, name: str, amount: Union[int, float] = 1,
-                        labels: Optional[Dict[str, str]] = None) -> None:
+                        labels: Optional[Dict[str, str]] = None,
+                        label_values: Optional[tuple] = None) -> None:
         """
         Increment a gauge metric.
         Args:
             name (str): Name of the gauge.
             amount (Union[int, float]): Amount to increment (default is 1).
             labels (Optional[Dict[str, str]]): Dictionary of label values to associate with this increment.
+            label_values (Optional[tuple]): Label values in declaration order; faster than the dict form.
         Raises:
             KeyError: If the gauge does not exist.
         """
-        if name not in self.metrics["gauge"]:
-            raise KeyError(f"Gauge with name '{name}' does not exist.")
-
-        metric = self.metrics["gauge"][name]
-        if labels:
-            metric.labels(**labels).inc(amount)
+        if label_values is None and labels:
+            label_values = self._ordered_label_values(name, labels, "Gauge")
+        if label_values is not None:
+            try:
+                metric = self._gauges[name]
+            except KeyError:
+                raise KeyError(f"Gauge with name '{name}' does not exist.")
+            self._child(metric, name, label_values).inc(amount)
         else:
-            metric.inc(amount)
+            try:
+                inc = self._gauge_inc[name]
+            except KeyError:
+                raise KeyError(f"Gauge with name '{name}' does not exist.")
+            inc(amount)
 
     def decrement_gauge(self, name: str, amount: Union[int, float] = 1,
-                        labels: Optional[Dict[str, str]] = None) -> None:
+                        labels: Optional[Dict[str, str]] = None,
+                        label_values: Optional[tuple] = None) -> None:
         """
         Decrement a gauge metric.
         Args:
             name (str): Name of the gauge.
             amount (Union[int, float]): Amount to decrement (default is 1).
             labels (Optional[Dict[str, str]]): Dictionary of label values to associate with this decrement.
+            label_values (Optional[tuple]): Label values in declaration order; faster than the dict form.
         Raises:
             KeyError: If the gauge does not exist.
         """
-        if name not in self.metrics["gauge"]:
-            raise KeyError(f"Gauge with name '{name}' does not exist.")
-
-        metric = self.metrics["gauge"][name]
-        if labels:
-            metric.labels(**labels).dec(amount)
+        if label_values is None and labels:
+            label_values = self._ordered_label_values(name, labels, "Gauge")
+        if label_values is not None:
+            try:
+                metric = self._gauges[name]
+            except KeyError:
+                raise KeyError(f"Gauge with name '{name}' does not exist.")
+            self._child(metric, name, label_values).dec(amount)
         else:
-            metric.dec(amount)
+            try:
+                dec = self._gauge_dec[name]
+            except KeyError:
+                raise KeyError(f"Gauge with name '{name}' does not exist.")
+            dec(amount)
 
-    def record_histogram(self, name: str, value: Union[int, float], labels: Optional[Dict[str, str]] = None) -> None:
+    def record_histogram(self, name: str, value: Union[int, float], labels: Optional[Dict[str, str]] = None,
+                         label_values: Optional[tuple] = None) -> None:
         """
         Record a value in a histogram metric.
         Args:
             name (str): Name of the histogram.
             value (Union[int, float]): Value to record.
             labels (Optional[Dict[str, str]]): Dictionary of label values to associate with this observation.
+            label_values (Optional[tuple]): Label values in declaration order; faster than the dict form.
+        Raises:
+            KeyError: If the histogram does not exist.
+        """
+        if label_values is None and labels:
+            label_values = self._ordered_label_values(name, labels, "Histogram")
+        if label_values is not None:
+            try:
+                metric = self._histograms[name]
+            except KeyError:
+                raise KeyError(f"Histogram with name '{name}' does not exist.")
+            self._child(metric, name, label_values).observe(value)
+        else:
+            try:
+                observe = self._hist_observe[name]
+            except KeyError:
+                raise KeyError(f"Histogram with name '{name}' does not exist.")
+            observe(value)
+
+    def reset_histogram_buckets(self, name: str, new_buckets) -> None:
+        """
+        Replace a histogram's bucket boundaries at runtime and zero its
+        observations, so one metric can follow a shifting value range
+        without carrying buckets for the whole range at once.
+        Args:
+            name (str): Name of the histogram.
+            new_buckets (list): New bucket boundaries.
+        Raises:
+            KeyError: If the histogram does not exist.
+            ValueError: If the buckets are invalid or the last reset was
+                less than RESET_MIN_INTERVAL seconds ago.
+        """
+        try:
+            metric = self._histograms[name]
+        except KeyError:
+            raise KeyError(f"Histogram with name '{name}' does not exist.")
+
+        now = time.monotonic()
+        if now - self._last_bucket_reset.get(name, float("-inf")) < self.RESET_MIN_INTERVAL:
+            raise ValueError(f"Histogram '{name}' buckets were reset less than "
+                             f"{self.RESET_MIN_INTERVAL} seconds ago.")
+
+        new_buckets = self._validate_buckets(new_buckets)
+        upper_bounds = list(new_buckets)
+        if upper_bounds[-1] != float("inf"):
+            upper_bounds.append(float("inf"))
+
+        labelnames = self._labelnames[name]
+        if labelnames:
+            # Children keep their identity (the child cache stays valid)
+            # but are re-initialized against the new bounds. The family lock
+            # guards the children map; only labeled families have one.
+            with metric._lock:
+                metric._upper_bounds = upper_bounds
+                metric._kwargs['buckets'] = new_buckets
+                for child in metric._metrics.values():
+                    child._upper_bounds = upper_bounds
+                    child._metric_init()
+        else:
+            metric._upper_bounds = upper_bounds
+            metric._kwargs['buckets'] = new_buckets
+            metric._metric_init()
+            self._hist_observe[name] = self._bisect_observe(metric)
+
+        self._buckets[name] = new_buckets
+        self._hist_upper[name] = tuple(upper_bounds)
+        self._last_bucket_reset[name] = now
+
+    def record_histogram_many(self, name: str, values, labels: Optional[Dict[str, str]] = None,
+                              label_values: Optional[tuple] = None) -> None:
+        """
+        Record a batch of values in a histogram metric.
+        The values are bucketed locally in one sorted pass and each bucket
+        counter is incremented once with its total, so a batch of n values
+        costs one update per bucket instead of n full observations.
+        Args:
+            name (str): Name of the histogram.
+            values (Sequence[Union[int, float]]): Values to record.
+            labels (Optional[Dict[str, str]]): Dictionary of label values to associate with this batch.
+            label_values (Optional[tuple]): Label values in declaration order; faster than the dict form.
         Raises:
             KeyError: If the histogram does not exist.
         """
-        if name not in self.metrics["histogram"]:
+        try:
+            metric = self._histograms[name]
+        except KeyError:
             raise KeyError(f"Histogram with name '{name}' does not exist.")
 
-        metric = self.metrics["histogram"][name]
-        if labels:
-            metric.labels(**labels).observe(value)
+        if not values:
+            return
+        if label_values is None and labels:
+            label_values = self._ordered_label_values(name, labels, "Histogram")
+        if label_values is not None:
+            child = self._child(metric, name, label_values)
         else:
-            metric.observe(value)
+            if self._labelnames[name]:
+                raise ValueError('histogram metric is missing label values')
+            child = metric
 
-    def record_summary(self, name: str, value: Union[int, float], labels: Optional[Dict[str, str]] = None) -> None:
+        upper_bounds = child._upper_bounds
+        counts = [0] * len(upper_bounds)
+        total = 0.0
+        i = 0
+        for v in sorted(values):
+            total += v
+            while v > upper_bounds[i]:
+                i += 1
+            counts[i] += 1
+        buckets = child._buckets
+        for i, count in enumerate(counts):
+            if count:
+                buckets[i].inc(count)
+        child._sum.inc(total)
+
+    def record_summary(self, name: str, value: Union[int, float], labels: Optional[Dict[str, str]] = None,
+                       label_values: Optional[tuple] = None) -> None:
         """
         Record a value in a summary metric.
         Args:
             name (str): Name of the summary.
             value (Union[int, float]): Value to record.
             labels (Optional[Dict[str, str]]): Dictionary of label values to associate with this observation.
+            label_values (Optional[tuple]): Label values in declaration order; faster than the dict form.
         Raises:
             KeyError: If the summary does not exist.
         """
-        if name not in self.metrics["summary"]:
-            raise KeyError(f"Summary with name '{name}' does not exist.")
-
-        metric = self.metrics["summary"][name]
-        if labels:
-            metric.labels(**labels).observe(value)
+        if label_values is None and labels:
+            label_values = self._ordered_label_values(name, labels, "Summary")
+        if label_values is not None:
+            try:
+                metric = self._summaries[name]
+            except KeyError:
+                raise KeyError(f"Summary with name '{name}' does not exist.")
+            self._child(metric, name, label_values).observe(value)
         else:
-            metric.observe(value)
\ No newline at end of file
+            try:
+                observe = self._summary_observe[name]
+            except KeyError:
+                raise KeyError(f"Summary with name '{name}' does not exist.")
+            observe(value)
\ No newline at end of file